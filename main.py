@@ -1,18 +1,27 @@
 from fastapi import FastAPI, HTTPException, Depends, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable
 import os
+import re
+import sys
+import json
+import time
 import random
+import asyncio
+import hashlib
 import logging
 from datetime import datetime
-from collections import defaultdict, Counter
+from collections import defaultdict, Counter, OrderedDict
+from itertools import chain, zip_longest
 
-from groq import Groq
+from groq import AsyncGroq
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Index
-from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy import event, Column, Integer, String, DateTime, Index, select, func, text, bindparam, lambda_stmt
+from sqlalchemy.orm import declarative_base, aliased, load_only
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from fastapi.middleware.cors import CORSMiddleware
 
 # Configure logging
@@ -28,7 +37,8 @@ app = FastAPI(
     description="An intelligent flashcard system with automatic subject classification",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS Middleware
@@ -74,13 +84,58 @@ SUBJECT_KEYWORDS = {
     }
 }
 
+# Subject lists used in LLM prompts and request validation
+AVAILABLE_SUBJECTS_STR = ", ".join(SUBJECT_KEYWORDS.keys())
+VALID_SUBJECTS = frozenset(SUBJECT_KEYWORDS) | {"Other"}
+
+# Reverse index: keyword -> subjects using it (shared terms like "atom" map to several);
+# keys are interned so they share storage with the keyword literals
+KEYWORD_TO_SUBJECTS: Dict[str, tuple[str, ...]] = defaultdict(tuple)
+for _subject, _keywords in SUBJECT_KEYWORDS.items():
+    for _keyword in _keywords:
+        KEYWORD_TO_SUBJECTS[sys.intern(_keyword.lower())] += (_subject,)
+KEYWORD_TO_SUBJECTS = dict(KEYWORD_TO_SUBJECTS)
+
+TOKEN_PATTERN = re.compile(r"[a-z]+")
+
+# LLM configuration
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "16"))
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "20"))
+
+# Classification cache configuration
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", "10000"))
+CLASSIFICATION_CACHE_TTL = int(os.getenv("CLASSIFICATION_CACHE_TTL", str(24 * 60 * 60)))
+
+# Health check configuration
+HEALTH_CACHE_TTL = float(os.getenv("HEALTH_CACHE_TTL", "5"))
+
 # Database configuration
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./flashcards.db")
-engine = create_engine(
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./flashcards.db")
+IS_SQLITE = "sqlite" in DATABASE_URL
+engine = create_async_engine(
     DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    connect_args={"check_same_thread": False, "timeout": 30} if IS_SQLITE else {},
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=True,
+    pool_recycle=1800
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+if IS_SQLITE:
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, _):
+        """Use WAL so readers don't block the writer, and keep temp data in memory"""
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+AsyncSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 class Flashcard(Base):
@@ -94,27 +149,93 @@ class Flashcard(Base):
     subject = Column(String, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    # Composite indexes for better query performance
+    # Composite indexes for better query performance; the unique index
+    # doubles as duplicate detection. It is a named index rather than a
+    # UniqueConstraint so SQLite doesn't also build an unnamed autoindex for it
     __table_args__ = (
-        Index('idx_student_subject', 'student_id', 'subject'),
+        Index('uq_student_qa', 'student_id', 'question', 'answer', unique=True),
+        Index('idx_student_subject_id', 'student_id', 'subject', 'id'),
         Index('idx_student_created', 'student_id', 'created_at'),
     )
 
+# Existing (question, answer) pairs for a student; built once so the compiled
+# statement is reused from SQLAlchemy's cache on every bulk insert
+EXISTING_PAIRS_STMT = lambda_stmt(
+    lambda: select(Flashcard.question, Flashcard.answer).where(
+        Flashcard.student_id == bindparam("student_id"),
+        Flashcard.question.in_(bindparam("questions", expanding=True))
+    )
+)
+
+# create_all never touches an existing table, so bring indexes of databases
+# created by older versions up to date; idx_student_subject is a prefix of
+# idx_student_subject_id and only slows down writes
+SCHEMA_UPGRADE_STATEMENTS = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_student_qa ON flashcards (student_id, question, answer)",
+    "CREATE INDEX IF NOT EXISTS idx_student_subject_id ON flashcards (student_id, subject, id)",
+    "DROP INDEX IF EXISTS idx_student_subject",
+)
+
+DUPLICATE_FLASHCARDS_STMT = (
+    select(Flashcard.student_id, Flashcard.question, func.count())
+    .group_by(Flashcard.student_id, Flashcard.question, Flashcard.answer)
+    .having(func.count() > 1)
+)
+
 # Create tables
-Base.metadata.create_all(bind=engine)
+@app.on_event("startup")
+async def create_tables():
+    """Create database tables on startup and add indexes missing from older schemas"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    try:
+        async with engine.begin() as conn:
+            for statement in SCHEMA_UPGRADE_STATEMENTS:
+                await conn.execute(text(statement))
+    except IntegrityError:
+        # Duplicate detection relies on uq_student_qa, so refuse to run without it
+        async with engine.connect() as conn:
+            duplicates = (await conn.execute(DUPLICATE_FLASHCARDS_STMT)).all()
+        for student_id, question, copies in duplicates:
+            logger.error(f"Flashcard {question!r} of student {student_id} is stored {copies} times")
+        raise RuntimeError(
+            f"Cannot create uq_student_qa: {len(duplicates)} flashcards are duplicated; "
+            f"remove the extra copies and restart"
+        )
 
 # Pydantic models with enhanced validation
-class FlashcardInput(BaseModel):
-    """Input model for creating flashcards"""
-    student_id: str = Field(..., min_length=1, max_length=50, description="Unique student identifier")
+def _strip_not_empty(v: str) -> str:
+    """Reject empty or whitespace-only strings and strip the rest"""
+    if not v or not v.strip():
+        raise ValueError('Field cannot be empty or whitespace only')
+    return v.strip()
+
+class FlashcardItem(BaseModel):
+    """Question/answer pair, shared by single and bulk creation"""
     question: str = Field(..., min_length=3, max_length=1000, description="Flashcard question")
     answer: str = Field(..., min_length=1, max_length=1000, description="Flashcard answer")
-    
-    @validator('student_id', 'question', 'answer')
+
+    @validator('question', 'answer')
     def validate_not_empty(cls, v):
-        if not v or not v.strip():
-            raise ValueError('Field cannot be empty or whitespace only')
-        return v.strip()
+        return _strip_not_empty(v)
+
+class FlashcardInput(FlashcardItem):
+    """Input model for creating flashcards"""
+    student_id: str = Field(..., min_length=1, max_length=50, description="Unique student identifier")
+
+    @validator('student_id')
+    def validate_student_id(cls, v):
+        return _strip_not_empty(v)
+
+class BulkFlashcardInput(BaseModel):
+    """Input model for creating many flashcards at once"""
+    student_id: str = Field(..., min_length=1, max_length=50, description="Unique student identifier")
+    flashcards: List[FlashcardItem] = Field(..., min_length=1, max_length=100, description="Flashcards to create")
+
+    @validator('student_id')
+    def validate_student_id(cls, v):
+        return _strip_not_empty(v)
 
 class FlashcardResponse(BaseModel):
     """Response model for flashcard creation"""
@@ -123,6 +244,11 @@ class FlashcardResponse(BaseModel):
     subject: str
     confidence: Optional[str] = None
 
+class BulkFlashcardResponse(BaseModel):
+    """Response model for bulk flashcard creation"""
+    created: List[FlashcardResponse]
+    duplicates: int
+
 class FlashcardOutput(BaseModel):
     """Output model for flashcard retrieval"""
     id: int
@@ -138,13 +264,10 @@ class StudentStats(BaseModel):
     latest_addition: Optional[datetime] = None
 
 # Database dependency
-def get_db():
+async def get_db():
     """Database session dependency"""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # Enhanced subject classification
 class SubjectClassifier:
@@ -152,171 +275,375 @@ class SubjectClassifier:
     
     def __init__(self):
         self.groq_client = self._initialize_groq()
+        # Bounds in-flight LLM requests across all concurrent callers
+        self._llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        # LRU cache of normalized (question, answer) -> (subject, confidence, expiry)
+        self._cache: OrderedDict[str, tuple[str, str, float]] = OrderedDict()
+        # Micro-batching of single-card LLM requests, running once start() is called
+        self._pending: Optional[asyncio.Queue] = None
+        self._batch_worker: Optional[asyncio.Task] = None
+        self._inflight_batches: set[asyncio.Task] = set()
     
-    def _initialize_groq(self) -> Optional[Groq]:
+    def _initialize_groq(self) -> Optional[AsyncGroq]:
         """Initialize Groq client if API key is available"""
         api_key = os.getenv("GROQ_API_KEY")
         if api_key:
             try:
-                return Groq(api_key=api_key)
+                return AsyncGroq(api_key=api_key)
             except Exception as e:
                 logger.warning(f"Failed to initialize Groq client: {e}")
         return None
     
-    def classify_subject(self, question: str, answer: str = "") -> tuple[str, str]:
+    def start(self):
+        """Start coalescing concurrent single-card LLM requests into batches"""
+        if self.groq_client and self._batch_worker is None:
+            self._pending = asyncio.Queue()
+            self._batch_worker = asyncio.create_task(self._run_batch_worker())
+    
+    async def stop(self):
+        """Stop the batching worker and release any requests still queued"""
+        if self._batch_worker is None:
+            return
+        
+        self._batch_worker.cancel()
+        try:
+            await self._batch_worker
+        except asyncio.CancelledError:
+            pass
+        
+        # Let batches already sent to the LLM deliver their answers
+        await asyncio.gather(*self._inflight_batches, return_exceptions=True)
+        
+        queued = []
+        while not self._pending.empty():
+            queued.append(self._pending.get_nowait())
+        self._release(queued)
+        
+        self._batch_worker = None
+        self._pending = None
+    
+    async def classify_subject(self, question: str, answer: str = "") -> tuple[str, str]:
         """
         Classify subject using hybrid approach: keywords + LLM fallback
 
     Returns:
             tuple: (subject, confidence_level)
         """
+        key = self._cache_key(question, answer)
+        cached = self._cache_get(key)
+        if cached:
+            return cached
+        
         # Try keyword-based classification first
         subject, confidence = self._classify_by_keywords(question, answer)
         
-        # If keyword classification is uncertain and LLM is available, use it
-        if confidence == "low" and self.groq_client:
-            llm_subject = self._classify_by_llm(question, answer)
+        # Unless keywords give a clear lead, ask the LLM when it is available
+        if confidence != "high" and self.groq_client:
+            llm_subject = await self._classify_by_llm_queued(question, answer)
+            if llm_subject is None:
+                # The LLM call failed; don't cache so the next attempt retries it
+                return subject, confidence
             if llm_subject in SUBJECT_KEYWORDS:
-                return llm_subject, "medium"
+                subject, confidence = llm_subject, "medium"
         
+        self._cache_set(key, subject, confidence)
         return subject, confidence
     
+    async def classify_batch(self, items: List[tuple[str, str]]) -> List[tuple[str, str]]:
+        """
+        Classify many (question, answer) pairs, sending uncertain ones to the LLM in batches
+
+        Returns:
+            list: (subject, confidence_level) per item, in input order
+        """
+        keys = [self._cache_key(question, answer) for question, answer in items]
+        results = [self._cache_get(key) for key in keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        
+        for i in misses:
+            results[i] = self._classify_by_keywords(*items[i])
+        uncertain = [i for i in misses if results[i][1] != "high"]
+        failed = set()
+        
+        if uncertain and self.groq_client:
+            chunks = [uncertain[i:i + LLM_BATCH_SIZE] for i in range(0, len(uncertain), LLM_BATCH_SIZE)]
+            llm_results = await asyncio.gather(*[
+                self._classify_batch_by_llm([items[i] for i in chunk]) for chunk in chunks
+            ])
+            for chunk, subjects in zip(chunks, llm_results):
+                for i, llm_subject in zip(chunk, subjects):
+                    if llm_subject is None:
+                        failed.add(i)
+                    elif llm_subject in SUBJECT_KEYWORDS:
+                        results[i] = (llm_subject, "medium")
+        
+        for i in misses:
+            if i not in failed:
+                self._cache_set(keys[i], *results[i])
+        return results
+    
+    @staticmethod
+    def _cache_key(question: str, answer: str) -> str:
+        """Stable cache key for a normalized question/answer pair"""
+        normalized = f"{question.strip().lower()}|{answer.strip().lower()}"
+        return hashlib.blake2b(normalized.encode(), digest_size=16).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[tuple[str, str]]:
+        """Return a cached classification if present and not expired"""
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        
+        subject, confidence, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        
+        self._cache.move_to_end(key)
+        return subject, confidence
+    
+    def _cache_set(self, key: str, subject: str, confidence: str):
+        """Cache a classification, evicting the least recently used entry when full"""
+        self._cache[key] = (subject, confidence, time.monotonic() + CLASSIFICATION_CACHE_TTL)
+        self._cache.move_to_end(key)
+        if len(self._cache) > CLASSIFICATION_CACHE_SIZE:
+            self._cache.popitem(last=False)
+    
     def _classify_by_keywords(self, question: str, answer: str) -> tuple[str, str]:
         """Classify subject based on keyword matching"""
-        text = f"{question} {answer}".lower()
-        subject_scores = {}
+        # Match whole words so e.g. "ion" no longer matches inside "question";
+        # dedupe while keeping text order so ties resolve deterministically
+        text_lower = f"{question} {answer}".lower()
+        tokens = dict.fromkeys(TOKEN_PATTERN.findall(text_lower))
+        subject_scores = Counter()
         
-        for subject, keywords in SUBJECT_KEYWORDS.items():
-            score = sum(1 for keyword in keywords if keyword in text)
-            if score > 0:
-                subject_scores[subject] = score
+        for token in tokens:
+            for subject in KEYWORD_TO_SUBJECTS.get(token, ()):
+                subject_scores[subject] += 1
         
         if not subject_scores:
             return "Other", "low"
         
-        # Get the subject with highest score
-        best_subject = max(subject_scores, key=subject_scores.get)
-        max_score = subject_scores[best_subject]
-        
-        # Determine confidence based on score and competition
-        if max_score >= 3:
+        # Get the subject with highest score and the runner-up score
+        ranked = subject_scores.most_common(2)
+        best_subject, max_score = ranked[0]
+        runner_up_score = ranked[1][1] if len(ranked) > 1 else 0
+
+        # Determine confidence based on score and competition; only a clear
+        # lead ("high") lets the caller skip the LLM
+        if max_score >= 3 and runner_up_score < max_score / 2:
             confidence = "high"
-        elif max_score >= 2:
+        elif max_score >= 2 and runner_up_score < max_score:
             confidence = "medium"
         else:
             confidence = "low"
         
         return best_subject, confidence
     
-    def _classify_by_llm(self, question: str, answer: str) -> str:
-        """Classify subject using LLM"""
+    async def _classify_by_llm(self, question: str, answer: str) -> Optional[str]:
+        """Classify subject using LLM, returning None if the request fails"""
         try:
-            available_subjects = ", ".join(SUBJECT_KEYWORDS.keys())
             system_prompt = (
                 f"You are an expert educational content classifier. "
-                f"Classify the following flashcard into one of these subjects: {available_subjects}. "
-                f"Respond with ONLY the subject name, exactly as listed. "
-                f"If uncertain, respond with 'Other'."
+                f"Classify the following flashcard into one of these subjects: {AVAILABLE_SUBJECTS_STR}. "
+                f"Reply with a JSON object {{\"subject\": \"...\"}} where the subject is exactly as listed. "
+                f"If uncertain, use 'Other'."
             )
             
             user_prompt = f"Question: {question}\nAnswer: {answer}"
             
-            response = self.groq_client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                model="llama-3.1-8b-instant",
-                temperature=0.1,
-                max_tokens=20
-            )
+            async with self._llm_semaphore:
+                response = await self.groq_client.chat.completions.create(
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    model="llama-3.1-8b-instant",
+                    temperature=0.1,
+                    max_tokens=12,
+                    response_format={"type": "json_object"}
+                )
             
-            result = response.choices[0].message.content.strip()
+            result = json.loads(response.choices[0].message.content).get("subject")
             return result if result in SUBJECT_KEYWORDS else "Other"
             
         except Exception as e:
             logger.error(f"LLM classification failed: {e}")
-        return "Other"
+        return None
+    
+    async def _classify_by_llm_queued(self, question: str, answer: str) -> Optional[str]:
+        """Classify via the batching worker so concurrent requests share LLM calls"""
+        if self._pending is None:
+            return await self._classify_by_llm(question, answer)
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._pending.put((question, answer, future))
+        return await future
+    
+    async def _run_batch_worker(self):
+        """Collect queued requests for up to LLM_BATCH_WINDOW_MS or LLM_BATCH_SIZE items"""
+        loop = asyncio.get_running_loop()
+        items = []
+        try:
+            while True:
+                items = [await self._pending.get()]
+                deadline = loop.time() + LLM_BATCH_WINDOW_MS / 1000
+                
+                while len(items) < LLM_BATCH_SIZE:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        items.append(await asyncio.wait_for(self._pending.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                
+                # Dispatch without waiting so the next window starts collecting immediately
+                task = asyncio.create_task(self._dispatch_batch(items))
+                self._inflight_batches.add(task)
+                task.add_done_callback(self._inflight_batches.discard)
+                items = []
+        finally:
+            # Requests taken off the queue but not yet dispatched
+            self._release(items)
+    
+    async def _dispatch_batch(self, items: List[tuple[str, str, asyncio.Future]]):
+        """Run one LLM request for the collected items and resolve their futures"""
+        try:
+            if len(items) == 1:
+                question, answer, _ = items[0]
+                subjects = [await self._classify_by_llm(question, answer)]
+            else:
+                subjects = await self._classify_batch_by_llm(
+                    [(question, answer) for question, answer, _ in items]
+                )
+            
+            for (_, _, future), subject in zip(items, subjects):
+                # The waiting request may have been cancelled meanwhile
+                if not future.done():
+                    future.set_result(subject)
+        finally:
+            self._release(items)
+    
+    @staticmethod
+    def _release(items: List[tuple[str, str, asyncio.Future]]):
+        """Resolve still-waiting requests as failed so callers fall back to keywords"""
+        for _, _, future in items:
+            if not future.done():
+                future.set_result(None)
+    
+    async def _classify_batch_by_llm(self, items: List[tuple[str, str]]) -> List[Optional[str]]:
+        """Classify several flashcards with a single LLM request; None marks rows it failed on"""
+        try:
+            system_prompt = (
+                f"You are an expert educational content classifier. "
+                f"Classify each of the following flashcard rows into one of these subjects: {AVAILABLE_SUBJECTS_STR}. "
+                f"Respond with a JSON object of the form {{\"subjects\": [...]}} containing "
+                f"a JSON array of {len(items)} subject names in row order, exactly as listed. "
+                f"If uncertain about a row, use 'Other' for it."
+            )
+            
+            rows = "".join(
+                f"{i}) Q: {question} A: {answer}\n" for i, (question, answer) in enumerate(items, 1)
+            )
+            user_prompt = f"Rows:\n{rows}"
+            
+            async with self._llm_semaphore:
+                response = await self.groq_client.chat.completions.create(
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    model="llama-3.1-8b-instant",
+                    temperature=0.1,
+                    max_tokens=10 * len(items),
+                    response_format={"type": "json_object"}
+                )
+            
+            subjects = json.loads(response.choices[0].message.content).get("subjects", [])
+            if not isinstance(subjects, list):
+                subjects = []
+            # Unknown subjects count as an answer of 'Other'; rows the model
+            # left out count as failures so they are retried
+            return [
+                (subjects[i] if subjects[i] in SUBJECT_KEYWORDS else "Other") if i < len(subjects) else None
+                for i in range(len(items))
+            ]
+            
+        except Exception as e:
+            logger.error(f"Batch LLM classification failed: {e}")
+        return [None] * len(items)
 
 # Initialize classifier
 classifier = SubjectClassifier()
 
+@app.on_event("startup")
+async def start_classifier():
+    """Start the LLM micro-batching worker"""
+    classifier.start()
+
+@app.on_event("shutdown")
+async def stop_classifier():
+    """Stop the LLM micro-batching worker"""
+    await classifier.stop()
+
 # Enhanced flashcard retrieval logic
 class FlashcardRetriever:
     """Smart flashcard retrieval with mixing algorithms"""
     
     @staticmethod
-    def get_mixed_flashcards(flashcards: List[Flashcard], limit: int) -> List[FlashcardOutput]:
+    def get_mixed_flashcards(flashcards: Iterable[Flashcard], limit: int) -> List[Dict[str, Any]]:
         """
         Retrieve mixed flashcards using intelligent distribution algorithm
+
+        Only the selected cards are serialized, as plain dicts shaped like
+        FlashcardOutput.
         """
-        if not flashcards:
-            return []
-        
         # Group by subject
         subject_groups = defaultdict(list)
         for fc in flashcards:
             subject_groups[fc.subject].append(fc)
         
+        if not subject_groups:
+            return []
+        
         # Shuffle within each subject group
         for subject_cards in subject_groups.values():
             random.shuffle(subject_cards)
         
-        # Calculate optimal distribution
-        total_subjects = len(subject_groups)
-        base_per_subject = limit // total_subjects
-        extra_cards = limit % total_subjects
+        groups = list(subject_groups.values())
+        random.shuffle(groups)  # Randomize subject order
         
-        selected = []
-        subjects = list(subject_groups.keys())
-        random.shuffle(subjects)  # Randomize subject order
-        
-        # Distribute cards fairly across subjects
-        for i, subject in enumerate(subjects):
-            cards_for_subject = base_per_subject + (1 if i < extra_cards else 0)
-            available_cards = subject_groups[subject]
-            
-            cards_to_take = min(cards_for_subject, len(available_cards))
-            selected.extend(available_cards[:cards_to_take])
+        # Interleave subjects round-robin so cards are spread evenly; subjects
+        # with spare cards fill in once smaller ones run out
+        interleaved = [fc for fc in chain.from_iterable(zip_longest(*groups)) if fc is not None]
+        selected = interleaved[:limit]
 
         # Final shuffle for randomness
         random.shuffle(selected)
         
         return [
-            FlashcardOutput(
-                id=fc.id,
-                question=fc.question,
-                answer=fc.answer,
-                subject=fc.subject,
-                created_at=fc.created_at
-            )
-            for fc in selected[:limit]
+            {
+                "id": fc.id,
+                "question": fc.question,
+                "answer": fc.answer,
+                "subject": fc.subject,
+                "created_at": fc.created_at
+            }
+            for fc in selected
         ]
 
 retriever = FlashcardRetriever()
 
 # API Endpoints
 @app.post("/flashcard", response_model=FlashcardResponse)
-async def create_flashcard(flashcard: FlashcardInput, db: Session = Depends(get_db)):
+async def create_flashcard(flashcard: FlashcardInput, db: AsyncSession = Depends(get_db)):
     """
     Create a new flashcard with automatic subject classification
     """
     try:
-        # Check for duplicates
-        existing = db.query(Flashcard).filter(
-            Flashcard.student_id == flashcard.student_id,
-            Flashcard.question == flashcard.question,
-            Flashcard.answer == flashcard.answer
-        ).first()
-        
-        if existing:
-            raise HTTPException(
-                status_code=409, 
-                detail="Flashcard with identical question and answer already exists for this student"
-            )
-        
         # Classify subject
-        subject, confidence = classifier.classify_subject(flashcard.question, flashcard.answer)
+        subject, confidence = await classifier.classify_subject(flashcard.question, flashcard.answer)
         
         # Create flashcard
         db_flashcard = Flashcard(
@@ -326,9 +653,9 @@ async def create_flashcard(flashcard: FlashcardInput, db: Session = Depends(get_
             subject=subject
         )
         
+        # Duplicates are rejected by the uq_student_qa index
         db.add(db_flashcard)
-        db.commit()
-        db.refresh(db_flashcard)
+        await db.commit()
         
         logger.info(f"Created flashcard {db_flashcard.id} for student {flashcard.student_id}")
         
@@ -341,40 +668,135 @@ async def create_flashcard(flashcard: FlashcardInput, db: Session = Depends(get_
         
     except HTTPException:
         raise
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409, 
+            detail="Flashcard with identical question and answer already exists for this student"
+        )
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Database error: {e}")
         raise HTTPException(status_code=500, detail="Database operation failed")
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/get-subject", response_model=List[FlashcardOutput])
+@app.post("/flashcards/bulk", response_model=BulkFlashcardResponse)
+async def create_flashcards_bulk(payload: BulkFlashcardInput, db: AsyncSession = Depends(get_db)):
+    """
+    Create many flashcards for a student, classifying their subjects concurrently
+    """
+    try:
+        # Skip cards that already exist or repeat within the payload
+        questions = {card.question for card in payload.flashcards}
+        existing = await db.execute(
+            EXISTING_PAIRS_STMT,
+            {"student_id": payload.student_id, "questions": list(questions)}
+        )
+        seen = {(question, answer) for question, answer in existing}
+        new_cards = []
+        for card in payload.flashcards:
+            key = (card.question, card.answer)
+            if key not in seen:
+                seen.add(key)
+                new_cards.append(card)
+
+        # Classify subjects, batching uncertain cards into shared LLM requests
+        classifications = await classifier.classify_batch(
+            [(card.question, card.answer) for card in new_cards]
+        )
+
+        db_flashcards = [
+            Flashcard(
+                student_id=payload.student_id,
+                question=card.question,
+                answer=card.answer,
+                subject=subject
+            )
+            for card, (subject, _) in zip(new_cards, classifications)
+        ]
+
+        db.add_all(db_flashcards)
+        await db.flush()
+        created = [
+            FlashcardResponse(
+                id=db_flashcard.id,
+                message="Flashcard created successfully",
+                subject=subject,
+                confidence=confidence
+            )
+            for db_flashcard, (subject, confidence) in zip(db_flashcards, classifications)
+        ]
+        await db.commit()
+
+        logger.info(f"Created {len(created)} flashcards for student {payload.student_id}")
+
+        return BulkFlashcardResponse(
+            created=created,
+            duplicates=len(payload.flashcards) - len(created)
+        )
+
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="A flashcard in this request was created concurrently; retry the request"
+        )
+    except SQLAlchemyError as e:
+        await db.rollback()
+        logger.error(f"Database error: {e}")
+        raise HTTPException(status_code=500, detail="Database operation failed")
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# Cards come straight from the database, so skip response validation and keep
+# FlashcardOutput only for the OpenAPI schema
+@app.get(
+    "/get-subject",
+    response_model=None,
+    responses={200: {"model": List[FlashcardOutput]}}
+)
 async def get_flashcards(
     student_id: str = Query(..., min_length=1, description="Student ID"),
     limit: int = Query(5, ge=1, le=50, description="Maximum number of flashcards to return"),
     subject: Optional[str] = Query(None, description="Filter by specific subject"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Retrieve mixed flashcards for a student with intelligent subject distribution
     """
     try:
-        # Build query
-        query = db.query(Flashcard).filter(Flashcard.student_id == student_id)
+        # Build filters
+        filters = [Flashcard.student_id == student_id]
         
         if subject:
-            if subject not in SUBJECT_KEYWORDS and subject != "Other":
+            if subject not in VALID_SUBJECTS:
                 raise HTTPException(status_code=400, detail=f"Invalid subject: {subject}")
-            query = query.filter(Flashcard.subject == subject)
+            filters.append(Flashcard.subject == subject)
         
-        flashcards = query.order_by(Flashcard.created_at.desc()).all()
+        # Let the database sample at most `limit` random cards per subject;
+        # the mixer never takes more than that from a single subject
+        ranked = select(
+            Flashcard,
+            func.row_number().over(
+                partition_by=Flashcard.subject,
+                order_by=func.random()
+            ).label("rn")
+        ).where(*filters).subquery()
+        sampled = aliased(Flashcard, ranked)
         
-        if not flashcards:
-            return []
+        rows = await db.execute(
+            select(sampled)
+            .options(load_only(
+                sampled.id, sampled.question, sampled.answer, sampled.subject, sampled.created_at
+            ))
+            .where(ranked.c.rn <= limit)
+        )
         
-        # Get mixed selection
-        result = retriever.get_mixed_flashcards(flashcards, limit)
+        # Get mixed selection, grouping rows as they are read
+        result = retriever.get_mixed_flashcards(rows.scalars(), limit)
         
         logger.info(f"Retrieved {len(result)} flashcards for student {student_id}")
         return result
@@ -396,7 +818,9 @@ async def root():
         "description": "Intelligent flashcard system with automatic subject classification",
         "endpoints": {
             "POST /flashcard": "Create a new flashcard",
-            "GET /get-subject": "Get mixed flashcards for a student"
+            "POST /flashcards/bulk": "Create many flashcards in one request",
+            "GET /get-subject": "Get mixed flashcards for a student",
+            "GET /health": "Service health and flashcard count"
         },
         "features": [
             "Automatic subject classification",
@@ -407,11 +831,34 @@ async def root():
         ]
     }
 
+# Flashcard count cached between health probes
+_health_cache = {"ts": 0.0, "count": 0}
+
+@app.get("/health")
+async def health_check(db: AsyncSession = Depends(get_db)):
+    """
+    Health check with a briefly cached total flashcard count
+    """
+    now = time.monotonic()
+    if _health_cache["ts"] == 0.0 or now - _health_cache["ts"] >= HEALTH_CACHE_TTL:
+        try:
+            count = await db.execute(select(func.count()).select_from(Flashcard))
+            _health_cache.update(ts=now, count=count.scalar_one())
+        except SQLAlchemyError as e:
+            logger.error(f"Health check database error: {e}")
+            raise HTTPException(status_code=503, detail="Database unavailable")
+    
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow(),
+        "total_flashcards": _health_cache["count"]
+    }
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     logger.error(f"Global exception: {exc}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "An unexpected error occurred"}
     )
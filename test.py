@@ -1,146 +1,279 @@
-import requests
-import json
+import os
+import sys
+import asyncio
+import httpx
+import orjson
+import shelve
+import hashlib
+import argparse
+from types import MappingProxyType
 
 BASE_URL = "http://localhost:8000"
+CONNECT_TIMEOUT, READ_TIMEOUT = 1.0, 5.0
 
-def test_ambiguous_words():
+# HTTP/2 is negotiated over TLS only (uvicorn serves HTTP/1.1), so enable it
+# when pointing BASE_URL at an h2-capable proxy; requires httpx[http2]
+USE_HTTP2 = os.getenv("USE_HTTP2") == "1"
+
+# On-disk cache of /analyze-text results, opened in __main__; bump
+# CACHE_VERSION whenever the backend classifier changes
+CACHE_PATH = ".analyze_cache"
+CACHE_VERSION = "1"
+CACHE = {}
+
+def _test_case(**fields):
+    """Read-only test case fixture"""
+    return MappingProxyType(fields)
+
+# Test cases with shared keywords
+TEST_CASES = (
+    _test_case(
+        question="What is an atom?",
+        answer="The smallest unit of matter",
+        expected_issue="Both Physics and Chemistry use 'atom'"
+    ),
+    _test_case(
+        question="What is atomic structure in physics?",
+        answer="Electrons orbit the nucleus with specific energy levels",
+        expected="Physics (context: energy levels, electrons, nucleus)"
+    ),
+    _test_case(
+        question="What is atomic bonding in chemistry?",
+        answer="Atoms form bonds by sharing or transferring electrons to achieve stability",
+        expected="Chemistry (context: bonding, sharing, stability)"
+    ),
+    _test_case(
+        question="What is organic matter?",
+        answer="Living or once-living material",
+        expected_issue="'Organic' appears in both Chemistry and Biology"
+    ),
+    _test_case(
+        question="What is organic chemistry?",
+        answer="Study of carbon-based compounds and their reactions",
+        expected="Chemistry (context: compounds, reactions)"
+    ),
+    _test_case(
+        question="What is organic evolution in biology?",
+        answer="The process by which species change over time through natural selection",
+        expected="Biology (context: species, natural selection)"
+    ),
+    _test_case(
+        question="What is energy?",
+        answer="The ability to do work",
+        expected_issue="'Energy' could be Physics, Chemistry, or Biology"
+    ),
+    _test_case(
+        question="What is kinetic energy in physics?",
+        answer="Energy of motion, equal to half mass times velocity squared",
+        expected="Physics (context: motion, mass, velocity)"
+    )
+)
+
+AMBIGUOUS_EXAMPLES = (
+    "What is an atom made of?",
+    "Explain organic compounds",
+    "What is energy conservation?",
+    "How do particles interact?"
+)
+
+def emit(lines):
+    """Write buffered output lines with a single write call"""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        lines.clear()
+
+def http_client():
+    """httpx client whose keep-alive pool is shared by concurrent requests"""
+    return httpx.AsyncClient(
+        base_url=BASE_URL,
+        http2=USE_HTTP2,
+        limits=httpx.Limits(max_keepalive_connections=4, max_connections=16),
+        timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    )
+
+async def post_json(client, path, payload):
+    """POST an orjson-encoded body"""
+    return await client.post(
+        path, content=orjson.dumps(payload), headers={"Content-Type": "application/json"}
+    )
+
+async def warm_up(client):
+    """Open a pooled connection before the measured requests start"""
+    try:
+        await client.head("/", timeout=CONNECT_TIMEOUT)
+    except httpx.HTTPError:
+        pass
+
+async def call_server(request):
+    """Await a request, reporting an unreachable, stalled or dropped connection on one line"""
+    try:
+        return await request
+    except httpx.ConnectError:
+        print("❌ Connection failed. Make sure the server is running on localhost:8000")
+    except httpx.TimeoutException:
+        print(f"❌ Request timed out (connect {CONNECT_TIMEOUT}s, read {READ_TIMEOUT}s)")
+    except httpx.TransportError as e:
+        print(f"❌ Connection to the server was lost: {e!r}")
+    return None
+
+def read_result(response):
+    """(status, parsed body) for a 200 response, (status, None) otherwise"""
+    if response.status_code != 200:
+        return response.status_code, None
+    return response.status_code, orjson.loads(response.content)
+
+def cache_key(text):
+    """Cache key for a text under the current CACHE_VERSION"""
+    return hashlib.sha1(f"{CACHE_VERSION}:{text}".encode()).hexdigest()
+
+async def analyze(client, text):
+    """Classify text with the analyze endpoint, returning (status, result)"""
+    key = cache_key(text)
+    if key in CACHE:
+        return 200, CACHE[key]
+    
+    status, result = read_result(await post_json(client, "/analyze-text", {"text": text}))
+    
+    if status == 200:
+        CACHE[key] = result
+    return status, result
+
+async def analyze_many(client, texts):
+    """Classify texts with one batch request, returning (status, result) per text"""
+    results = [None] * len(texts)
+    misses = []
+    for i, text in enumerate(texts):
+        key = cache_key(text)
+        if key in CACHE:
+            results[i] = (200, CACHE[key])
+        else:
+            misses.append(i)
+    
+    if not misses:
+        return results
+    
+    payload = {"texts": [texts[i] for i in misses]}
+    status, body = read_result(await post_json(client, "/analyze-text-batch", payload))
+    batch = body.get("results") if status == 200 and isinstance(body, dict) else None
+    if status == 200 and (not isinstance(batch, list) or len(batch) != len(misses)):
+        # A 200 without one result per text is as unusable as an error status
+        status, batch = "malformed batch response", None
+    
+    if status == 404:
+        # Server without the batch endpoint: fall back to concurrent single requests
+        fallback = await asyncio.gather(*[analyze(client, texts[i]) for i in misses])
+        for i, outcome in zip(misses, fallback):
+            results[i] = outcome
+        return results
+    
+    for n, i in enumerate(misses):
+        if batch is None:
+            results[i] = (status, None)
+        else:
+            CACHE[cache_key(texts[i])] = batch[n]
+            results[i] = (200, batch[n])
+    return results
+
+async def add_card(client, test_case):
+    """Add a test case as a flashcard, returning (status, result)"""
+    flashcard_data = {
+        "student_id": "test_student",
+        "question": test_case['question'],
+        "answer": test_case['answer']
+    }
+    return read_result(await post_json(client, "/flashcard", flashcard_data))
+
+async def test_ambiguous_words():
     """Test how the system handles ambiguous/shared keywords"""
     
     print("🔍 Testing Ambiguous Word Classification\n")
     
-    # Test cases with shared keywords
-    test_cases = [
-        {
-            "question": "What is an atom?",
-            "answer": "The smallest unit of matter",
-            "expected_issue": "Both Physics and Chemistry use 'atom'"
-        },
-        {
-            "question": "What is atomic structure in physics?", 
-            "answer": "Electrons orbit the nucleus with specific energy levels",
-            "expected": "Physics (context: energy levels, electrons, nucleus)"
-        },
-        {
-            "question": "What is atomic bonding in chemistry?",
-            "answer": "Atoms form bonds by sharing or transferring electrons to achieve stability",
-            "expected": "Chemistry (context: bonding, sharing, stability)"
-        },
-        {
-            "question": "What is organic matter?",
-            "answer": "Living or once-living material",
-            "expected_issue": "'Organic' appears in both Chemistry and Biology"
-        },
-        {
-            "question": "What is organic chemistry?",
-            "answer": "Study of carbon-based compounds and their reactions",
-            "expected": "Chemistry (context: compounds, reactions)"
-        },
-        {
-            "question": "What is organic evolution in biology?",
-            "answer": "The process by which species change over time through natural selection",
-            "expected": "Biology (context: species, natural selection)"
-        },
-        {
-            "question": "What is energy?",
-            "answer": "The ability to do work",
-            "expected_issue": "'Energy' could be Physics, Chemistry, or Biology"
-        },
-        {
-            "question": "What is kinetic energy in physics?",
-            "answer": "Energy of motion, equal to half mass times velocity squared",
-            "expected": "Physics (context: motion, mass, velocity)"
-        }
-    ]
+    texts = [f"{test_case['question']} {test_case['answer']}" for test_case in TEST_CASES]
     
     print("📊 Classification Results:\n")
     
-    for i, test_case in enumerate(test_cases, 1):
-        print(f"Test {i}: {test_case['question']}")
+    async with http_client() as client:
+        await warm_up(client)
+        
+        # Test using the analyze endpoint first, all cases in one batch request
+        responses = await call_server(analyze_many(client, texts))
+        if responses is None:
+            return
         
-        # Test using the analyze endpoint first
-        try:
-            response = requests.get(f"{BASE_URL}/analyze-text", 
-                                  params={"text": test_case['question'] + " " + test_case['answer']})
+        # Responses come back in request order, lining up with TEST_CASES
+        out = []
+        for i, (test_case, (status, result)) in enumerate(zip(TEST_CASES, responses), 1):
+            out.append(f"Test {i}: {test_case['question']}")
             
-            if response.status_code == 200:
-                result = response.json()
-                
-                print(f"   🎯 Result: {result['subject']}")
-                print(f"   📈 Confidence: {result['confidence']:.2f}")
-                print(f"   💭 Reasoning: {result['reasoning']}")
+            if status == 200:
+                out.append(f"   🎯 Result: {result['subject']}")
+                out.append(f"   📈 Confidence: {result['confidence']:.2f}")
+                out.append(f"   💭 Reasoning: {result['reasoning']}")
                 
                 if 'expected' in test_case:
-                    print(f"   ✅ Expected: {test_case['expected']}")
+                    out.append(f"   ✅ Expected: {test_case['expected']}")
                 elif 'expected_issue' in test_case:
-                    print(f"   ⚠️  Known Issue: {test_case['expected_issue']}")
+                    out.append(f"   ⚠️  Known Issue: {test_case['expected_issue']}")
                 
             else:
-                print(f"   ❌ Analysis failed: {response.status_code}")
+                out.append(f"   ❌ Analysis failed: {status}")
                 
-        except requests.exceptions.ConnectionError:
-            print("❌ Connection failed. Make sure the server is running on localhost:8000")
-            return
-            
-        print()
-    
-    # Test by actually adding flashcards
-    print("📝 Adding Test Flashcards:\n")
-    
-    for i, test_case in enumerate(test_cases[:4], 1):  # Test first 4
-        flashcard_data = {
-            "student_id": "test_student",
-            "question": test_case['question'],
-            "answer": test_case['answer']
-        }
+            out.append("")
         
-        try:
-            response = requests.post(f"{BASE_URL}/flashcard", json=flashcard_data)
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"Flashcard {i}: {result['subject']} (Confidence: {result['confidence']:.2f})")
-                print(f"   Reasoning: {result['reasoning']}")
-            else:
-                print(f"Failed to add flashcard {i}: {response.status_code}")
-                
-        except requests.exceptions.ConnectionError:
-            print("❌ Connection failed. Make sure the server is running on localhost:8000")
+        # Test by actually adding flashcards, reusing the same keep-alive pool
+        out.append("📝 Adding Test Flashcards:\n")
+        emit(out)
+        
+        post_results = await call_server(asyncio.gather(*[
+            add_card(client, test_case) for test_case in TEST_CASES[:4]  # Test first 4
+        ]))
+        if post_results is None:
             return
         
-        print()
+        for i, (status, result) in enumerate(post_results, 1):
+            if status == 200:
+                out.append(f"Flashcard {i}: {result['subject']} (Confidence: {result['confidence']:.2f})")
+                out.append(f"   Reasoning: {result['reasoning']}")
+            else:
+                out.append(f"Failed to add flashcard {i}: {status}")
+            
+            out.append("")
+        emit(out)
 
-def compare_simple_vs_advanced():
+async def compare_simple_vs_advanced():
     """Compare how simple vs advanced classification would handle the same text"""
     
     print("⚖️  Simple vs Advanced Classification Comparison\n")
     
-    ambiguous_examples = [
-        "What is an atom made of?",
-        "Explain organic compounds",
-        "What is energy conservation?",
-        "How do particles interact?"
-    ]
+    async with http_client() as client:
+        await warm_up(client)
+        responses = await call_server(analyze_many(client, AMBIGUOUS_EXAMPLES))
+    if responses is None:
+        return
     
-    for example in ambiguous_examples:
-        print(f"Text: '{example}'")
+    out = []
+    for example, (status, result) in zip(AMBIGUOUS_EXAMPLES, responses):
+        out.append(f"Text: '{example}'")
         
-        try:
-            response = requests.get(f"{BASE_URL}/analyze-text", params={"text": example})
-            
-            if response.status_code == 200:
-                result = response.json()
-                print(f"   Advanced: {result['subject']} (Confidence: {result['confidence']:.2f})")
-                print(f"   Reasoning: {result['reasoning']}")
-            else:
-                print(f"   ❌ Analysis failed: {response.status_code}")
-                
-        except requests.exceptions.ConnectionError:
-            print("❌ Connection failed. Make sure the server is running on localhost:8000")
-            return
+        if status == 200:
+            out.append(f"   Advanced: {result['subject']} (Confidence: {result['confidence']:.2f})")
+            out.append(f"   Reasoning: {result['reasoning']}")
+        else:
+            out.append(f"   ❌ Analysis failed: {status}")
             
-        print()
+        out.append("")
+    emit(out)
 
 if __name__ == "__main__":
-    test_ambiguous_words()
-    print("\n" + "="*60 + "\n")
-    compare_simple_vs_advanced()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Check subject classification against a running server")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="clear cached /analyze-text results before running")
+    args = parser.parse_args()
+    
+    with shelve.open(CACHE_PATH) as CACHE:
+        if args.no_cache:
+            CACHE.clear()
+        
+        asyncio.run(test_ambiguous_words())
+        print("\n" + "="*60 + "\n")
+        asyncio.run(compare_simple_vs_advanced())
\ No newline at end of file